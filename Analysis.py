@@ -1,22 +1,78 @@
+import functools
 import sqlite3
+import matplotlib
+# Headless backend: skips GUI startup and lets the plots render straight to files
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
+import numpy as np
 import os
 
 # Save name of database to use in functions
 DB_NAME = "temp.db"
 
+# One shared connection for the whole module so SQLite parses and compiles
+# each query string only once (sqlite3 caches statements per connection)
+_CONN = None
+
+def connect_db():
+    """
+    Setup a connection to the project database, reusing one module-level connection
+    ARGUMENTS:
+        None
+    RETURNS:
+        cur, conn
+    """
+    global _CONN
+    if _CONN is None:
+        path = os.path.dirname(os.path.abspath(__file__))
+        _CONN = sqlite3.connect(path + "/" + DB_NAME)
+        _CONN.execute("PRAGMA journal_mode=WAL")
+        _CONN.execute("PRAGMA synchronous=NORMAL")
+        _CONN.execute("PRAGMA cache_size=-64000")
+        _CONN.execute("PRAGMA temp_store=MEMORY")
+    cur = _CONN.cursor()
+    return cur, _CONN
+
+def create_indexes():
+    """
+    Create indexes on the join columns so lookups use the B-tree instead of a full scan
+    ARGUMENTS:
+        None
+    RETURNS:
+        None
+    """
+    cur, conn = connect_db()
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_weather_date_id ON Weather(date_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_cfb_date_id ON cfb_games(date_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_cfb_opponent_id ON cfb_games(opponent_id)")
+    # Refresh planner statistics so SQLite actually picks the new indexes
+    cur.execute("ANALYZE")
+    conn.commit()
+
 def fetch_game_weather_data():
     """
-    Query database and find data for football games and their weather conditions 
+    Query database and find data for football games and their weather conditions
     ARGUMENTS:
         None
     RETURNS:
-        games: different football games with their weather conditions (list)
+        games: one NumPy array per game/weather column (dictionary)
 
     """
     path = os.path.dirname(os.path.abspath(__file__))
-    conn = sqlite3.connect(path + "/" + DB_NAME)
-    cur = conn.cursor()
+    return _load_games(os.path.getmtime(path + "/" + DB_NAME))
+
+@functools.lru_cache(maxsize=4)
+def _load_games(mtime):
+    """
+    Load the game/weather join, cached until the database file changes
+    ARGUMENTS:
+        mtime: database file modification time, used as the cache key (float)
+    RETURNS:
+        games: one NumPy array per game/weather column (dictionary)
+    """
+    cur, conn = connect_db()
+    # Pull rows in big batches to cut down on per-row fetch calls
+    cur.arraysize = 1000
 
     query = '''
         SELECT 
@@ -25,10 +81,10 @@ def fetch_game_weather_data():
             c.points_for,
             c.points_against,
             c.home,
-            w.temp_mean,
-            w.cloud_cover,
-            w.wind_speed,
-            w.precipitation
+            COALESCE(w.temp_mean, 0) AS temp_mean,
+            COALESCE(w.cloud_cover, 0) AS cloud_cover,
+            COALESCE(w.wind_speed, 0) AS wind_speed,
+            COALESCE(w.precipitation, 0) AS precipitation
         FROM cfb_games AS c
         JOIN dates AS d ON c.date_id = d.id
         JOIN opponents AS o ON c.opponent_id = o.id
@@ -37,39 +93,59 @@ def fetch_game_weather_data():
     '''
 
     cur.execute(query)
-    rows = cur.fetchall()
-    conn.close()
-
-    games = []
-    for r in rows:
-        games.append({
-            "points_for": r[2],
-            "points_against": r[3],
-            "home": r[4],
-            "opponent": r[1],
-            "temp_mean": r[5] or 0,
-            "cloud_cover": r[6] or 0,
-            "precipitation": r[8] or 0,
-            "wind_speed": r[7] or 0,
-            "date": r[0]
-        })
+    rows = []
+    while True:
+        batch = cur.fetchmany()
+        if not batch:
+            break
+        rows.extend(batch)
+
+    # Store each column as one typed array instead of a dict per game, so
+    # filters like games['points_for'][games['home'] == 1] run in C.
+    # fromiter with count presizes each buffer and fills it straight from
+    # the row tuples, skipping the intermediate per-column lists
+    n = len(rows)
+    games = {
+        "date": np.array([r[0] for r in rows]),
+        "opponent": np.array([r[1] for r in rows]),
+        "points_for": np.fromiter((r[2] for r in rows), np.int32, count=n),
+        "points_against": np.fromiter((r[3] for r in rows), np.int32, count=n),
+        "home": np.fromiter((r[4] for r in rows), np.int8, count=n),
+        "temp_mean": np.fromiter((r[5] for r in rows), np.float32, count=n),
+        "cloud_cover": np.fromiter((r[6] for r in rows), np.float32, count=n),
+        "wind_speed": np.fromiter((r[7] for r in rows), np.float32, count=n),
+        "precipitation": np.fromiter((r[8] for r in rows), np.float32, count=n),
+    }
+
+    # Freeze the arrays so callers can't mutate the cached copy
+    for column in games.values():
+        column.flags.writeable = False
 
     return games
 
 # Analysis functions to create calculations
+# Each calculation runs as one aggregate query so SQLite scans the join once
+# and returns just the bucket totals instead of every row
 
-def precipitation_analysis(games):
+def precipitation_analysis():
 
     """
     Find percentage of points scored in games with precipitation
     ARGUMENTS:
-        games: different football games with their weather conditions (list)
+        None
     RETURNS:
         rain_percentage: percentage of rain (float)
- 
+
     """
-    total_points = sum(g['points_for'] for g in games)
-    rain_points = sum(g['points_for'] for g in games if g['precipitation'] > 0)
+    cur, conn = connect_db()
+    cur.execute('''
+        SELECT
+            SUM(c.points_for),
+            SUM(CASE WHEN COALESCE(w.precipitation, 0) > 0 THEN c.points_for ELSE 0 END)
+        FROM cfb_games AS c
+        JOIN Weather AS w ON c.date_id = w.date_id
+    ''')
+    total_points, rain_points = cur.fetchone()
 
     rain_percentage = (rain_points / total_points) * 100 if total_points else 0
     print(f"Percentage of points scored in games with precipitation: {rain_percentage:.2f}%\n")
@@ -77,68 +153,88 @@ def precipitation_analysis(games):
     return rain_percentage
 
 
-def wind_home_advantage(games):
+def wind_home_advantage():
     """
     Find the home team advantages when wind speeds are above 15 mph and below 15mph
     ARGUMENTS:
-        games: different football games with their weather conditions (list)
+        None
     RETURNS:
         averages: average points scored for home and away under different wind speeds (dictionary)
- 
+
     """
-    categories = {
-        "low_wind_home": [g['points_for'] for g in games if g['home'] == 1 and g['wind_speed'] <= 15],
-        "high_wind_home": [g['points_for'] for g in games if g['home'] == 1 and g['wind_speed'] > 15],
-        "low_wind_away": [g['points_for'] for g in games if g['home'] == 0 and g['wind_speed'] <= 15],
-        "high_wind_away": [g['points_for'] for g in games if g['home'] == 0 and g['wind_speed'] > 15],
-    }
+    cur, conn = connect_db()
+    cur.execute('''
+        SELECT
+            AVG(c.points_for) FILTER (WHERE c.home = 1 AND COALESCE(w.wind_speed, 0) <= 15),
+            AVG(c.points_for) FILTER (WHERE c.home = 1 AND COALESCE(w.wind_speed, 0) > 15),
+            AVG(c.points_for) FILTER (WHERE c.home = 0 AND COALESCE(w.wind_speed, 0) <= 15),
+            AVG(c.points_for) FILTER (WHERE c.home = 0 AND COALESCE(w.wind_speed, 0) > 15)
+        FROM cfb_games AS c
+        JOIN Weather AS w ON c.date_id = w.date_id
+    ''')
+    row = cur.fetchone()
 
+    keys = ["low_wind_home", "high_wind_home", "low_wind_away", "high_wind_away"]
     averages = {}
-    for key, points in categories.items():
-        avg_points = sum(points)/len(points) if points else 0
+    for key, avg_points in zip(keys, row):
+        avg_points = avg_points if avg_points is not None else 0
         averages[key] = avg_points
         print(f"Average points for {key.replace('_', ' ')}: {avg_points:.2f}")
 
     return averages
 
-def pts_by_temp(games):
+def pts_by_temp():
     """
     Find the average points scored for a game when the mean temperature is above 45 degrees and below 45 degrees Fahrenheit
     ARGUMENTS:
-        games: different football games with their weather conditions (list)
+        None
     RETURNS:
         averages: average points scored for home and away under different temperatues (dictionary)
- 
+
     """
-    categories = {
-        "Below 45": [g['points_for'] for g in games if g['home'] == 1 and g['temp_mean'] < 45],
-        "Above 45": [g['points_for'] for g in games if g['home'] == 1 and g['temp_mean'] > 45],
-    }
+    cur, conn = connect_db()
+    cur.execute('''
+        SELECT
+            AVG(c.points_for) FILTER (WHERE c.home = 1 AND COALESCE(w.temp_mean, 0) < 45),
+            AVG(c.points_for) FILTER (WHERE c.home = 1 AND COALESCE(w.temp_mean, 0) > 45)
+        FROM cfb_games AS c
+        JOIN Weather AS w ON c.date_id = w.date_id
+    ''')
+    row = cur.fetchone()
+
     avgs = {}
-    for key, points in categories.items():
-        avg_pts = sum(points) / len(points) if points else 0
-        avgs[key] = round(avg_pts, 2)
+    for key, avg_pts in zip(["Below 45", "Above 45"], row):
+        avgs[key] = round(avg_pts if avg_pts is not None else 0, 2)
     return avgs
 
-def pts_by_cloud(games):
+def pts_by_cloud():
     """
     Find the average points scored for a game when the cloud coverage is above 50 percent and below 50 percent
     ARGUMENTS:
-        games: different football games with their weather conditions (list)
+        None
     RETURNS:
         averages: average points scored for home and away under different cloud covers (dictionary)
- 
+
     """
-    cates = {
-    "Below 50%": [g['points_for'] for g in games if g['home'] == 1 and g['cloud_cover'] < 50],
-    "Above 50%": [g['points_for'] for g in games if g['home'] == 1 and g['cloud_cover'] > 50],
-    "Above 50% Against": [g['points_against'] for g in games if g['home'] == 1 and g['cloud_cover'] > 50],
-    "Below 50% Against": [g['points_against'] for g in games if g['home'] == 1 and g['cloud_cover'] < 50],
-    }
-    avg = {}
-    for key, points in cates.items():
-        pts = sum(points) / len(points) if points else 0
-        avg[key] = round(pts, 2)
+    cur, conn = connect_db()
+    # One grouped scan returns both buckets; games at exactly 50% stay
+    # excluded like the old < / > comparisons did
+    cur.execute('''
+        SELECT
+            COALESCE(w.cloud_cover, 0) > 50 AS high_cloud,
+            AVG(c.points_for),
+            AVG(c.points_against)
+        FROM cfb_games AS c
+        JOIN Weather AS w ON c.date_id = w.date_id
+        WHERE c.home = 1 AND COALESCE(w.cloud_cover, 0) <> 50
+        GROUP BY high_cloud
+    ''')
+
+    avg = {"Below 50%": 0, "Above 50%": 0, "Above 50% Against": 0, "Below 50% Against": 0}
+    for high_cloud, pts_for, pts_against in cur.fetchall():
+        label = "Above 50%" if high_cloud else "Below 50%"
+        avg[label] = round(pts_for, 2)
+        avg[f"{label} Against"] = round(pts_against, 2)
     return avg
 
 # Graphing functions for calculations
@@ -152,11 +248,12 @@ def plot_precipitation_graph(rain_percentage):
         None 
     """
 
-    plt.bar(["Precipitation", "No Precipitation"], [rain_percentage, 100 - rain_percentage])
-    plt.title("Percent of Points Scored in Precipitation Michigan Football Games")
-    plt.ylabel("Points Scored")
-    plt.show()
-    plt.close()
+    fig, ax = plt.subplots()
+    ax.bar(["Precipitation", "No Precipitation"], [rain_percentage, 100 - rain_percentage])
+    ax.set_title("Percent of Points Scored in Precipitation Michigan Football Games")
+    ax.set_ylabel("Points Scored")
+    fig.savefig("precipitation.png")
+    plt.close(fig)
 
 def plot_wind_graph(averages):
     """
@@ -174,12 +271,13 @@ def plot_wind_graph(averages):
         averages["high_wind_away"]
     ]
 
-    plt.bar(labels, values, color='orange')
-    plt.xticks(rotation=20)
-    plt.ylabel("Average Points Scored")
-    plt.title("Points Scored by Wind Speed + Home/Away")
-    plt.show()
-    plt.close()
+    fig, ax = plt.subplots()
+    ax.bar(labels, values, color='orange')
+    ax.tick_params(axis='x', rotation=20)
+    ax.set_ylabel("Average Points Scored")
+    ax.set_title("Points Scored by Wind Speed + Home/Away")
+    fig.savefig("wind.png")
+    plt.close(fig)
 
 def plot_pts_temp(avg_d):
     """
@@ -190,12 +288,13 @@ def plot_pts_temp(avg_d):
         None 
     """
     colors = ["skyblue", "green"]
-    plt.barh(list(avg_d.keys()), list(avg_d.values()), color=colors)
-    plt.ylabel('Mean Temperature Fahrenheit')
-    plt.xlabel('Points Scored')
-    plt.title('Michigan Football Performance Under Temperature')
-    plt.show()
-    plt.close()
+    fig, ax = plt.subplots()
+    ax.barh(list(avg_d.keys()), list(avg_d.values()), color=colors)
+    ax.set_ylabel('Mean Temperature Fahrenheit')
+    ax.set_xlabel('Points Scored')
+    ax.set_title('Michigan Football Performance Under Temperature')
+    fig.savefig("temperature.png")
+    plt.close(fig)
 
 def plot_pts_cloud(avg):
     """
@@ -209,16 +308,17 @@ def plot_pts_cloud(avg):
     categories = ["Below 50%", "Above 50%"]
     points_for = [avg["Below 50%"], avg["Above 50%"]]
     points_against = [avg["Below 50% Against"], avg["Above 50% Against"]]
-    plt.figure(figsize=(8,6))
+    fig, ax = plt.subplots(figsize=(8,6))
     colors = ["orange", "#319E84"]
-    plt.bar(categories, points_for, label="Home Points", color=colors[1])
-    plt.bar(categories, points_against, bottom=points_for, label="Away Points", color=colors[0])  
+    ax.bar(categories, points_for, label="Home Points", color=colors[1])
+    ax.bar(categories, points_against, bottom=points_for, label="Away Points", color=colors[0])
 
-    plt.ylabel("Average Points")
-    plt.xlabel("Cloud Coverage")
-    plt.title("Average Points Scored By Michigan Football vs. Opponent")
-    plt.legend()
-    plt.show()            
+    ax.set_ylabel("Average Points")
+    ax.set_xlabel("Cloud Coverage")
+    ax.set_title("Average Points Scored By Michigan Football vs. Opponent")
+    ax.legend()
+    fig.savefig("cloud.png")
+    plt.close(fig)
 
 
 
@@ -227,31 +327,42 @@ def main():
     # Compute results for calculation questions
     print("ANALYSIS STARTING...\n")
     filename = 'results.txt'
-    games = fetch_game_weather_data()
-    total_games = f"Total games fetched with weather data: {len(games)}\n"
+    create_indexes()
+    cur, conn = connect_db()
+    cur.execute('''
+        SELECT COUNT(*)
+        FROM cfb_games AS c
+        JOIN Weather AS w ON c.date_id = w.date_id
+    ''')
+    game_count = cur.fetchone()[0]
+    total_games = f"Total games fetched with weather data: {game_count}\n"
     print(total_games)
-    rain_percentage = precipitation_analysis(games)
-    averages = wind_home_advantage(games)
+    rain_percentage = precipitation_analysis()
+    averages = wind_home_advantage()
 
-    averages_temp = pts_by_temp(games)
-    cloud = pts_by_cloud(games)
+    averages_temp = pts_by_temp()
+    cloud = pts_by_cloud()
 
     # Write calculation results to a text file
     base_path = os.path.abspath(os.path.dirname(__file__))
     full_path = os.path.join(base_path, filename)
+    # Build the whole report first so the file is written in one call
+    results = (
+        f"{total_games}"
+        f"Average points for low wind home: {averages['low_wind_home']}\n"
+        f"Average points for high wind home: {averages['high_wind_home']}\n"
+        f"Average points for low wind away: {averages['low_wind_away']}\n"
+        f"Average points for high wind away: {averages['high_wind_away']}\n"
+        f"Percentage of points scored in games with precipitation: {rain_percentage:.2f}%\n"
+        f"Average points for temperatures below 45°F: {averages_temp['Below 45']}\n"
+        f"Average points for temperatures above 45°F: {averages_temp['Above 45']}\n"
+        f"Average home points for cloud coverage below 50%: {cloud['Below 50%']}\n"
+        f"Average home points for cloud coverage above 50%: {cloud['Above 50%']}\n"
+        f"Average away points for cloud coverage below 50%: {cloud['Below 50% Against']}\n"
+        f"Average away points for cloud coverage Above 50%: {cloud['Above 50% Against']}\n"
+    )
     with open(full_path, "w") as file:
-        file.write(f"{total_games}")
-        file.write(f"Average points for low wind home: {averages['low_wind_home']}\n")
-        file.write(f"Average points for high wind home: {averages['high_wind_home']}\n")
-        file.write(f"Average points for low wind away: {averages['low_wind_away']}\n")
-        file.write(f"Average points for high wind away: {averages['high_wind_away']}\n")
-        file.write(f"Percentage of points scored in games with precipitation: {rain_percentage:.2f}%\n")
-        file.write(f"Average points for temperatures below 45°F: {averages_temp['Below 45']}\n")
-        file.write(f"Average points for temperatures above 45°F: {averages_temp['Above 45']}\n")
-        file.write(f"Average home points for cloud coverage below 50%: {cloud['Below 50%']}\n")
-        file.write(f"Average home points for cloud coverage above 50%: {cloud['Above 50%']}\n")
-        file.write(f"Average away points for cloud coverage below 50%: {cloud['Below 50% Against']}\n")
-        file.write(f"Average away points for cloud coverage Above 50%: {cloud['Above 50% Against']}\n")
+        file.write(results)
   
     print("DEBUG averages =", averages)
 
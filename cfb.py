@@ -1,12 +1,35 @@
+import collections
+import concurrent.futures
+import functools
+import logging
 import os
 import requests
 import sqlite3
+import sys
 import unittest
 
+logger = logging.getLogger(__name__)
 
+# Resolve the script directory once so per-call path lookups skip the syscalls
+_BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+
+# Lightweight row type: a namedtuple costs a fraction of a per-row dict
+Game = collections.namedtuple("Game", ["game_id", "date", "opponent", "points_for", "points_against", "home"])
+
+# Prefer orjson's C parser for the season payloads, fall back to stdlib json
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    import json
+    _loads = json.loads
+
+
+@functools.lru_cache(maxsize=None)
 def get_api_key(filename):
     '''
     Loads the College Football API key from a file.
+    The key is cached so the file is only read once per process.
 
     ARGUMENTS:
         filename: the file that contains your API key
@@ -15,8 +38,7 @@ def get_api_key(filename):
         the API key as a string
     '''
 
-    base_path = os.path.abspath(os.path.dirname(__file__))
-    full_path = os.path.join(base_path, filename)
+    full_path = os.path.join(_BASE_PATH, filename)
     with open(full_path) as f:
         return f.read().strip()
 
@@ -24,6 +46,11 @@ def get_api_key(filename):
 
 API_KEY = get_api_key('cfb_key.txt')
 
+# One shared session keeps the TLS connection to the API alive across fetches
+_SESSION = requests.Session()
+_SESSION.headers["Authorization"] = f"Bearer {API_KEY}"
+_SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=8))
+
 
 def get_cfb_data(team, year):
     '''
@@ -38,12 +65,11 @@ def get_cfb_data(team, year):
         JSON data from the API as a Python dict
     '''
     url = "https://api.collegefootballdata.com/games"
-    headers = {"Authorization": f"Bearer {API_KEY}"}
     params = {"year": year, "team": team}
 
-    response = requests.get(url, headers=headers, params=params)
-    print(f"[DEBUG] API response for {team} {year}: {response}")
-    return response.json()
+    response = _SESSION.get(url, params=params)
+    response.raise_for_status()
+    return _loads(response.content)
 
 
 
@@ -54,37 +80,25 @@ def process_cfb_data(raw_data, TEAM="Michigan"):
         raw_data: query from College Football Data API (JSON)
         TEAM: Michigan football team (string)
     RETURNS:
-        games: a record of Michigan football games (list)
+        games: a record of Michigan football games, one at a time (generator)
     """
-    games = []
     for g in raw_data:
-        date_raw = g.get("startDate", "unknown")
-        date_clean = date_raw.split("T")[0] if "T" in date_raw else date_raw
-
-        home_team = g.get("homeTeam", "unknown")
-        away_team = g.get("awayTeam", "unknown")
-
-        if home_team == TEAM:
-            opponent = away_team
-            points_for = g.get("homePoints", 0)
-            points_against = g.get("awayPoints", 0)
-            home = 1
-        else:
-            opponent = home_team
-            points_for = g.get("awayPoints", 0)
-            points_against = g.get("homePoints", 0)
-            home = 0
-
-        games.append({
-            "date": date_clean,
-            "opponent": opponent,
-            "points_for": points_for,
-            "points_against": points_against,
+        # Bind the lookups once per game so the loop body is mostly dict ops
+        get = g.get
+        home_team = get("homeTeam", "unknown")
+        home = 1 if home_team == TEAM else 0
+
+        yield {
+            # The games endpoint always returns startDate as an ISO string,
+            # so no per-row type check is needed
+            # Interning dedups the strings that repeat across seasons, so
+            # dedup-set tuples and dict lookups compare by pointer
+            "date": sys.intern(get("startDate", "unknown").partition("T")[0]),
+            "opponent": sys.intern(get("awayTeam", "unknown") if home else home_team),
+            "points_for": get("homePoints", 0) if home else get("awayPoints", 0),
+            "points_against": get("awayPoints", 0) if home else get("homePoints", 0),
             "home": home
-        })
-
-    print(f"[DEBUG] First 3 processed games: {games[:3]}")
-    return games
+        }
 
 
 
@@ -99,8 +113,12 @@ def setup_db(db_name):
     RETURNS:
         cursor, connection
     '''
-    path = os.path.dirname(os.path.abspath(__file__))
-    conn = sqlite3.connect(path + "/" + db_name)
+    conn = sqlite3.connect(os.path.join(_BASE_PATH, db_name))
+    # WAL + relaxed syncing batches fsyncs so bulk inserts aren't disk-bound
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-64000")
     cur = conn.cursor()
     print(f"[SETUP] Connected to database: {db_name}")
     return cur, conn
@@ -122,7 +140,7 @@ def create_opponent_table(cur):
             name TEXT UNIQUE
         )
     ''')
-    print("[DEBUG] Opponents table ensured.")
+    logger.debug("Opponents table ensured.")
 
 #helpers for storing data with foreign keys
 def get_opponent_id(cur, opponent_name):
@@ -156,7 +174,7 @@ def get_date_id(cur, date_str):
     row = cur.fetchone()
     if row:
         return row[0]
-    print(f"[DEBUG] Date not found in dates table: {date_str}")
+    logger.debug("Date not found in dates table: %s", date_str)
     return None
 
 def load_cfb_data(cur):
@@ -165,7 +183,7 @@ def load_cfb_data(cur):
     ARGUMENTS: 
         cur: cursor to execute SQL commands (cursor)
     RETURNS: 
-        None
+        games: Game namedtuples for every stored game (list)
     """
     cur.execute('''
         SELECT c.id, d.day, o.name, c.points_for, c.points_against, c.home
@@ -174,11 +192,9 @@ def load_cfb_data(cur):
         JOIN dates AS d ON c.date_id = d.id
     ''')
     rows = cur.fetchall()
-    print(f"[DEBUG] Loaded {len(rows)} rows from cfb_games")
-    return [
-        {"game_id": r[0], "date": r[1], "opponent": r[2], "points_for": r[3], "points_against": r[4], "home": r[5]}
-        for r in rows
-    ]
+    logger.debug("Loaded %d rows from cfb_games", len(rows))
+    # Game._make is a C-level tuple constructor, so no per-row dict is built
+    return list(map(Game._make, rows))
 
 
 
@@ -207,46 +223,81 @@ def store_cfb_data(games, cur, conn):
             FOREIGN KEY(opponent_id) REFERENCES opponents(id)
         )
     ''')
-    rows_db = cur.fetchall()
-    games_db = set()
-    for row in rows_db:
-        current = (row[0], row[1], row[2], row[3], row[4])
-        games_db.add(current)
-
-    remaining = []
-    for g in games:
-        current = (g["date"], g["opponent"], g["points_for"], g["points_against"], g["home"])
-        if current not in games_db:
-            remaining.append(g)
-    
-
-    batch_size = 25
-    batch = remaining[:batch_size]
-    inserts = []
-    for g in batch:
-        opponent_id = get_opponent_id(cur, g["opponent"])
-        date_id = get_date_id(cur, g["date"])
-        if date_id is None:
-            # Insert missing date
-            cur.execute("INSERT INTO dates (day) VALUES (?)", (g["date"],))
-            date_id = cur.lastrowid
-            print(f"[INFO] Added missing date {g['date']}")
-
-        inserts.append((date_id, opponent_id, g["points_for"], g["points_against"], g["home"]))
-
-    if inserts:
-        cur.executemany('''
-            INSERT INTO cfb_games (date_id, opponent_id, points_for, points_against, home)
-            VALUES (?, ?, ?, ?, ?)
-        ''', inserts)
-        print(f"Inserted {len(inserts)} rows")
-
-    conn.commit()
-    return batch
+    # Covering index answers the dedup SELECT index-only; dates(day) lookups
+    # become B-tree seeks instead of table scans
+    cur.execute('''
+        CREATE INDEX IF NOT EXISTS idx_cfb_games_dedup
+        ON cfb_games(date_id, opponent_id, points_for, points_against, home)
+    ''')
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_dates_day ON dates(day)")
+
+    games = list(games)
+
+    # One transaction for the whole store: commits on success, rolls back on error
+    with conn:
+        # Resolve every opponent in a few statements instead of two per game
+        cur.execute("SELECT name, id FROM opponents")
+        opp_map = {name: opp_id for name, opp_id in cur.fetchall()}
+        missing = {g["opponent"] for g in games if g["opponent"] not in opp_map}
+        if missing:
+            cur.executemany("INSERT OR IGNORE INTO opponents (name) VALUES (?)", [(name,) for name in missing])
+            cur.execute("SELECT name, id FROM opponents")
+            opp_map = {name: opp_id for name, opp_id in cur.fetchall()}
+
+        # Same batching for dates: one map load, one insert for whatever is missing
+        cur.execute("SELECT day, id FROM dates")
+        date_map = dict(cur.fetchall())
+        missing_days = {g["date"] for g in games if g["date"] not in date_map}
+        if missing_days:
+            cur.executemany("INSERT OR IGNORE INTO dates (day) VALUES (?)", [(day,) for day in missing_days])
+            cur.execute("SELECT day, id FROM dates")
+            date_map = dict(cur.fetchall())
+            logger.info("Added %d missing dates", len(missing_days))
+
+        # Stage every candidate and let SQLite's anti-join pick out the new games,
+        # instead of pulling the whole stored table into a Python set
+        batch_size = 25
+        cur.execute("DROP TABLE IF EXISTS temp.staging")
+        cur.execute('''
+            CREATE TEMP TABLE staging (
+                date_id INTEGER,
+                opponent_id INTEGER,
+                points_for INTEGER,
+                points_against INTEGER,
+                home INTEGER
+            )
+        ''')
+        cur.executemany(
+            "INSERT INTO staging VALUES (?, ?, ?, ?, ?)",
+            ((date_map[g["date"]], opp_map[g["opponent"]], g["points_for"], g["points_against"], g["home"]) for g in games)
+        )
+        # staging rowids run 1..N in input order, so they map back to the games list
+        cur.execute('''
+            SELECT s.rowid FROM staging AS s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM cfb_games AS c
+                WHERE c.date_id = s.date_id AND c.opponent_id = s.opponent_id
+                  AND c.points_for = s.points_for AND c.points_against = s.points_against
+                  AND c.home = s.home
+            )
+            ORDER BY s.rowid
+            LIMIT ?
+        ''', (batch_size,))
+        new_ids = [row[0] for row in cur.fetchall()]
+        batch = [games[rowid - 1] for rowid in new_ids]
+
+        if new_ids:
+            placeholders = ",".join("?" * len(new_ids))
+            cur.execute(f'''
+                INSERT INTO cfb_games (date_id, opponent_id, points_for, points_against, home)
+                SELECT date_id, opponent_id, points_for, points_against, home
+                FROM staging WHERE rowid IN ({placeholders})
+            ''', new_ids)
+            logger.info("Inserted %d rows", len(new_ids))
 
-# UNIT TESTS 
+    return batch
 
-import unittest
+# UNIT TESTS
 
 class TestCFBFunctions(unittest.TestCase):
 
@@ -270,7 +321,7 @@ class TestCFBFunctions(unittest.TestCase):
                 "awayPoints": 7
             }
         ]
-        processed = process_cfb_data(sample_raw, TEAM="Michigan")
+        processed = list(process_cfb_data(sample_raw, TEAM="Michigan"))
 
         expected = {
             "date": "2023-10-14",
@@ -293,7 +344,7 @@ class TestCFBFunctions(unittest.TestCase):
                 "awayPoints": 30
             }
         ]
-        processed = process_cfb_data(sample_raw, TEAM="Michigan")
+        processed = list(process_cfb_data(sample_raw, TEAM="Michigan"))
 
         expected = {
             "date": "2023-09-20",
@@ -308,7 +359,7 @@ class TestCFBFunctions(unittest.TestCase):
     def test_process_cfb_data_missing_keys(self):
         # Handles case when API response is missing expected keys
         sample_raw = [{}]  # empty dict
-        processed = process_cfb_data(sample_raw, TEAM="Michigan")
+        processed = list(process_cfb_data(sample_raw, TEAM="Michigan"))
 
         expected = {
             "date": "unknown",
@@ -340,15 +391,18 @@ def main():
     years = [2023, 2022, 2021, 2020, 2019, 2018, 2017, 2016]
     all_games = []
 
-    for y in years:
-        print(f"\n[API] Pulling data for {team} in {y}...")
-        raw = get_cfb_data(team, y)
+    # Fetch every season at once; each request mostly waits on the network
+    print(f"\n[API] Pulling data for {team} in {years}...")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(years)) as executor:
+        raws = list(executor.map(lambda y: get_cfb_data(team, y), years))
+
+    for y, raw in zip(years, raws):
         if not raw:
             print(f"[API] No data found for {y}")
             continue
-        processed = process_cfb_data(raw)
-        print(f"[API] Processed {len(processed)} games from {y}")
-        all_games.extend(processed)
+        before = len(all_games)
+        all_games.extend(process_cfb_data(raw))
+        print(f"[API] Processed {len(all_games) - before} games from {y}")
 
     print("\n[INFO] Total games across all years:", len(all_games))
 